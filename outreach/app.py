@@ -4,6 +4,13 @@ from pathlib import Path
 import streamlit as st
 
 from src.bot_logic import get_response
+from src.chat_history import (
+    is_valid_session_id,
+    SESSION_TTL,
+    load_session,
+    new_session_id,
+    save_session,
+)
 
 
 ROOT_DIR = Path(__file__).resolve().parent
@@ -11,9 +18,16 @@ ASSETS_DIR = ROOT_DIR / "assets"
 LOGO_PATH = ASSETS_DIR / "lab_logo.png"
 AVATAR_PATH = ASSETS_DIR / "avatar.gif"
 
+
+@st.cache_resource(show_spinner=False)
+def asset_exists(path: Path) -> bool:
+    """Check for an optional asset once per process, not on every rerun."""
+    return path.exists()
+
+
 st.set_page_config(
     page_title="Hickey Lab AI Assistant",
-    page_icon=str(LOGO_PATH) if LOGO_PATH.exists() else "🧬",
+    page_icon=str(LOGO_PATH) if asset_exists(LOGO_PATH) else "🧬",
 )
 
 st.title("🧬 Hickey Lab AI Assistant")
@@ -24,7 +38,7 @@ def show_sidebar():
     """Render sidebar with avatar and instructions."""
     with st.sidebar:
         st.header("About")
-        if AVATAR_PATH.exists():
+        if asset_exists(AVATAR_PATH):
             st.image(str(AVATAR_PATH), caption="Hickey Lab Assistant", use_column_width=True)
         else:
             st.info("Add assets/avatar.gif to show the assistant avatar.")
@@ -36,20 +50,68 @@ def show_sidebar():
             3. Start chatting below.
             """
         )
+        show_chat_link()
+
+
+def get_session_id() -> str:
+    """Get this browser session's ID, resuming the one in the URL if there is one.
+    
+    New IDs stay server-side; they only reach the URL (and get saved to disk)
+    when the visitor asks for a link to the chat, see show_chat_link.
+    """
+    if "session_id" not in st.session_state:
+        session_id = st.query_params.get("sid")
+        if not is_valid_session_id(session_id):
+            session_id = new_session_id()
+        st.session_state.session_id = session_id
+    return st.session_state.session_id
+
+
+def is_chat_linked() -> bool:
+    """Check whether this chat is kept at a link, and so saved to disk."""
+    return st.query_params.get("sid") == get_session_id()
+
+
+def show_chat_link():
+    """Offer to keep the chat at a link, so it can be reopened after a reload."""
+    if is_chat_linked():
+        st.caption(
+            f"🔗 This chat is saved at this page's link for {SESSION_TTL // 86400} days. "
+            "Anyone with the link can read it."
+        )
+    elif st.button(
+        "🔗 Save a link to this chat",
+        help="Adds an ID to the page URL so you can come back to this chat. "
+        "Anyone with the link can read it.",
+    ):
+        st.query_params["sid"] = get_session_id()
+        save_chat()
+        st.rerun()
+
+
+def save_chat():
+    """Persist the current conversation, if the visitor asked for a link to it."""
+    if is_chat_linked():
+        save_session(get_session_id(), {"messages": st.session_state.messages})
 
 
 def init_session_state():
-    """Initialize chat history."""
+    """Initialize chat history, restoring a saved session if there is one."""
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = load_session(get_session_id()).get("messages", [])
 
 
 def render_chat():
-    """Display chat history and handle new input."""
+    """Display chat history and handle new input.
+    
+    Not a fragment: st.chat_input only pins to the bottom of the page when it
+    sits outside any container, and a fragment wraps its body in one.
+    """
     for message in st.session_state.messages:
         st.chat_message(message["role"]).markdown(message["content"])
 
-    if prompt := st.chat_input("Ask about our research..."):
+    # Whitespace-only input is dropped before any model call
+    if prompt := (st.chat_input("Ask about our research...") or "").strip():
         st.session_state.messages.append({"role": "user", "content": prompt})
         st.chat_message("user").markdown(prompt)
 
@@ -66,12 +128,13 @@ def render_chat():
             st.error(str(exc))
 
         st.session_state.messages.append({"role": "assistant", "content": response})
+        save_chat()
         st.chat_message("assistant").markdown(response)
 
 
 def main():
-    show_sidebar()
     init_session_state()
+    show_sidebar()
     render_chat()
 
 
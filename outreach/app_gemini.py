@@ -6,11 +6,22 @@ Docs: https://ai.google.dev/gemini-api/docs/file-search
 
 import os
 from pathlib import Path
+from typing import Iterator
 
 import streamlit as st
 
+from src.chat_history import (
+    SESSION_TTL,
+    is_valid_session_id,
+    load_session,
+    new_session_id,
+    save_session,
+)
 from src.gemini_bot_logic import (
-    get_response, 
+    MAX_TURNS,
+    get_response_stream,
+    history_cut,
+    summarize_conversation,
     get_client,
     get_knowledge_files,
     get_or_create_file_search_store,
@@ -26,118 +37,219 @@ ASSETS_DIR = ROOT_DIR / "assets"
 LOGO_PATH = ASSETS_DIR / "lab_logo.png"
 AVATAR_PATH = ASSETS_DIR / "avatar.gif"
 
+
+@st.cache_resource(show_spinner=False)
+def asset_exists(path: Path) -> bool:
+    """Check for an optional asset once per process, not on every rerun."""
+    return path.exists()
+
+
 st.set_page_config(
     page_title="Hickey Lab AI Assistant (Gemini)",
-    page_icon=str(LOGO_PATH) if LOGO_PATH.exists() else "🧬",
+    page_icon=str(LOGO_PATH) if asset_exists(LOGO_PATH) else "🧬",
 )
 
 st.title("🧬 Hickey Lab AI Assistant")
 st.caption("Powered by Google Gemini 2.5 Flash | Ask about our research, spatial omics, and lab publications.")
 
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_knowledge_files() -> list[Path]:
+    """Local knowledge base listing, refreshed at most once a minute."""
+    return get_knowledge_files()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_store_info() -> dict:
+    """File Search store details, refreshed at most once a minute.
+    
+    Also records which local files aren't indexed yet, so the sync-status
+    diff is computed once per refresh rather than on every rerun.
+    """
+    store_info = get_store_info()
+    local_names = {f.name for f in get_knowledge_files()}
+    indexed_names = {f['display_name'] for f in store_info['files']}
+    store_info['new_files'] = sorted(local_names - indexed_names)
+    return store_info
+
+
+def _clear_sidebar_cache():
+    """Drop cached sidebar data after the store changes."""
+    _cached_knowledge_files.clear()
+    _cached_store_info.clear()
+
+
 def show_sidebar():
     """Render sidebar with info and file status."""
     with st.sidebar:
-        st.header("About")
-        if AVATAR_PATH.exists():
-            st.image(str(AVATAR_PATH), caption="Hickey Lab Assistant", use_column_width=True)
-        
-        st.markdown("---")
-        st.subheader("🔧 Pipeline: Gemini File Search")
-        st.markdown(
-            """
-            This version uses **Google's Gemini 2.5 Flash** with the 
-            **File Search API** - Google's managed semantic search 
-            over your documents.
-            
-            **How it works:**
-            1. Files uploaded to File Search store
-            2. Google chunks & embeds automatically
-            3. Semantic search finds relevant passages
-            4. Gemini generates grounded answers
-            
-            **Pros:**
-            - Google handles RAG infrastructure
-            - Semantic search (not just keywords)
-            - Citations available
-            - Storage is free
-            
-            **Cons:**
-            - Files on Google's servers
-            - Pay for embedding at upload time
-            """
-        )
+        sidebar_fragment()
+        show_chat_link()
+
+
+@st.fragment
+def sidebar_fragment():
+    """Render the sidebar contents.
+    
+    Runs as a fragment, so widgets here rerun only the sidebar, not the chat.
+    """
+    st.header("About")
+    if asset_exists(AVATAR_PATH):
+        st.image(str(AVATAR_PATH), caption="Hickey Lab Assistant", use_column_width=True)
+    
+    st.markdown("---")
+    st.subheader("🔧 Pipeline: Gemini File Search")
+    st.markdown(
+        """
+        This version uses **Google's Gemini 2.5 Flash** with the 
+        **File Search API** - Google's managed semantic search 
+        over your documents.
         
-        st.markdown("---")
-        st.subheader("📁 Knowledge Base")
+        **How it works:**
+        1. Files uploaded to File Search store
+        2. Google chunks & embeds automatically
+        3. Semantic search finds relevant passages
+        4. Gemini generates grounded answers
         
-        # Show local files
-        knowledge_files = get_knowledge_files()
-        if knowledge_files:
-            st.write(f"**{len(knowledge_files)} local files:**")
-            for f in knowledge_files:
-                st.write(f"- {f.name}")
-        else:
-            st.warning("No files in knowledge base!")
+        **Pros:**
+        - Google handles RAG infrastructure
+        - Semantic search (not just keywords)
+        - Citations available
+        - Storage is free
         
-        # Show indexed files
-        st.markdown("---")
-        st.subheader("🗂️ File Search Store")
+        **Cons:**
+        - Files on Google's servers
+        - Pay for embedding at upload time
+        """
+    )
+    
+    st.toggle(
+        "🐢 Detailed answers",
+        key="detailed_answers",
+        help="Lift the answer length cap and let Gemini think before answering. Slower.",
+    )
+    
+    st.markdown("---")
+    st.subheader("📁 Knowledge Base")
+    
+    # Show local files
+    knowledge_files = _cached_knowledge_files()
+    if knowledge_files:
+        st.write(f"**{len(knowledge_files)} local files:**")
+        for f in knowledge_files:
+            st.write(f"- {f.name}")
+    else:
+        st.warning("No files in knowledge base!")
+    
+    # Show indexed files
+    st.markdown("---")
+    st.subheader("🗂️ File Search Store")
+    
+    try:
+        store_info = _cached_store_info()
+        st.write(f"**Store:** `{store_info['display_name']}`")
+        st.write(f"**Created:** {store_info['create_time'][:19]}")
+        st.write(f"**Indexed:** {store_info['indexed_files']} files")
         
-        try:
-            store_info = get_store_info()
-            st.write(f"**Store:** `{store_info['display_name']}`")
-            st.write(f"**Created:** {store_info['create_time'][:19]}")
-            st.write(f"**Indexed:** {store_info['indexed_files']} files")
-            
-            with st.expander("📄 View indexed files"):
-                for f in store_info['files']:
-                    status_icon = "✅" if f['state'] == "ACTIVE" else "⏳"
-                    st.write(f"{status_icon} {f['display_name']}")
-                    
-            # Check for sync status
-            local_names = {f.name for f in knowledge_files}
-            indexed_names = {f['display_name'] for f in store_info['files']}
-            
-            new_files = local_names - indexed_names
-            if new_files:
-                st.warning(f"⚠️ {len(new_files)} new file(s) not yet indexed")
-                for f in new_files:
-                    st.write(f"  - {f}")
-            else:
-                st.success("✅ All local files are indexed")
+        with st.expander("📄 View indexed files"):
+            for f in store_info['files']:
+                status_icon = "✅" if f['state'] == "ACTIVE" else "⏳"
+                st.write(f"{status_icon} {f['display_name']}")
                 
-        except Exception as e:
-            st.info(f"Store not initialized yet. Ask a question to set it up.")
-        
-        # Actions
-        st.markdown("---")
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("🔄 Re-index"):
-                with st.spinner("Re-uploading files..."):
-                    try:
-                        delete_file_search_store()
-                        results = upload_files_to_file_search_store(force_reupload=True)
-                        st.success(f"Indexed {len(results['uploaded'])} files!")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Failed: {e}")
-        with col2:
-            if st.button("🗑️ Clear Store"):
-                with st.spinner("Deleting store..."):
-                    try:
-                        delete_file_search_store()
-                        st.success("Store deleted!")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Failed: {e}")
+        # Check for sync status
+        new_files = store_info['new_files']
+        if new_files:
+            st.warning(f"⚠️ {len(new_files)} new file(s) not yet indexed")
+            for f in new_files:
+                st.write(f"  - {f}")
+        else:
+            st.success("✅ All local files are indexed")
+            
+    except Exception as e:
+        st.info(f"Store not initialized yet. Ask a question to set it up.")
+    
+    # Actions
+    st.markdown("---")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 Re-index"):
+            with st.spinner("Re-uploading changed files..."):
+                try:
+                    results = upload_files_to_file_search_store()
+                    st.success(
+                        f"Indexed {len(results['uploaded'])} files "
+                        f"({len(results['skipped'])} unchanged)!"
+                    )
+                    _clear_sidebar_cache()
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Failed: {e}")
+    with col2:
+        if st.button("🗑️ Clear Store"):
+            with st.spinner("Deleting store..."):
+                try:
+                    delete_file_search_store()
+                    st.success("Store deleted!")
+                    _clear_sidebar_cache()
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Failed: {e}")
+
+
+def get_session_id() -> str:
+    """Get this browser session's ID, resuming the one in the URL if there is one.
+    
+    New IDs stay server-side; they only reach the URL (and get saved to disk)
+    when the visitor asks for a link to the chat, see show_chat_link.
+    """
+    if "session_id" not in st.session_state:
+        session_id = st.query_params.get("sid")
+        if not is_valid_session_id(session_id):
+            session_id = new_session_id()
+        st.session_state.session_id = session_id
+    return st.session_state.session_id
+
+
+def is_chat_linked() -> bool:
+    """Check whether this chat is kept at a link, and so saved to disk."""
+    return st.query_params.get("sid") == get_session_id()
+
+
+def show_chat_link():
+    """Offer to keep the chat at a link, so it can be reopened after a reload."""
+    if is_chat_linked():
+        st.caption(
+            f"🔗 This chat is saved at this page's link for {SESSION_TTL // 86400} days. "
+            "Anyone with the link can read it."
+        )
+    elif st.button(
+        "🔗 Save a link to this chat",
+        help="Adds an ID to the page URL so you can come back to this chat. "
+        "Anyone with the link can read it.",
+    ):
+        st.query_params["sid"] = get_session_id()
+        save_chat()
+        st.rerun()
+
+
+def save_chat():
+    """Persist the current conversation, if the visitor asked for a link to it."""
+    if not is_chat_linked():
+        return
+    save_session(get_session_id(), {
+        "messages": st.session_state.messages,
+        "history_summary": st.session_state.history_summary,
+        "summarized_count": st.session_state.summarized_count,
+    })
 
 
 def init_session_state():
-    """Initialize chat history and Gemini."""
+    """Initialize chat history (restoring a saved session) and Gemini."""
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        saved = load_session(get_session_id())
+        st.session_state.messages = saved.get("messages", [])
+        # Older turns are summarized once instead of being re-sent every turn
+        st.session_state.history_summary = saved.get("history_summary", "")
+        st.session_state.summarized_count = saved.get("summarized_count", 0)
     
     if "gemini_initialized" not in st.session_state:
         try:
@@ -148,8 +260,60 @@ def init_session_state():
             st.session_state.gemini_initialized = False
 
 
+def get_model_history() -> list[dict]:
+    """Get the recent turns to send with the latest prompt.
+    
+    These are the turns not yet folded into st.session_state.history_summary
+    (see update_history_summary), capped at MAX_TURNS exchanges.
+    """
+    # Everything after the summarized prefix, minus the prompt just appended
+    history = st.session_state.messages[st.session_state.summarized_count:-1]
+    return history[-2 * MAX_TURNS:]
+
+
+def update_history_summary() -> bool:
+    """Fold the oldest turns into the conversation summary once history outgrows its limits.
+    
+    Keeps at most MAX_TURNS exchanges, and HISTORY_CHAR_BUDGET characters,
+    verbatim; anything older goes into st.session_state.history_summary (the
+    displayed transcript is left untouched). Called after an answer has been
+    shown, so the extra Gemini call never delays the reply. Returns True if the
+    summary changed.
+    """
+    history = st.session_state.messages[st.session_state.summarized_count:]
+    cut = history_cut(history)  # Whole user/assistant exchanges only
+    if not cut:
+        return False
+    try:
+        st.session_state.history_summary = summarize_conversation(
+            history[:cut], st.session_state.history_summary
+        )
+    except Exception:
+        return False  # Try again after the next answer
+    st.session_state.summarized_count += cut
+    return True
+
+
+def stream_with_spinner(chunks: Iterator[str], message: str = "Searching documents...") -> Iterator[str]:
+    """Show a spinner until the first chunk arrives, then pass the stream through.
+    
+    The first chunk can take a while (store setup, uploads, retrieval), so the
+    visitor sees progress instead of an empty message.
+    """
+    with st.spinner(message):
+        first = next(chunks, None)
+    if first is None:
+        return
+    yield first
+    yield from chunks
+
+
 def render_chat():
-    """Display chat history and handle new input."""
+    """Display chat history and handle new input.
+    
+    Not a fragment: st.chat_input only pins to the bottom of the page when it
+    sits outside any container, and a fragment wraps its body in one.
+    """
     if not st.session_state.get("gemini_initialized", False):
         st.error("Gemini not initialized. Check your GEMINI_API_KEY in .env")
         return
@@ -157,30 +321,46 @@ def render_chat():
     for message in st.session_state.messages:
         st.chat_message(message["role"]).markdown(message["content"])
 
-    if prompt := st.chat_input("Ask about our research..."):
+    # Whitespace-only input is dropped before any model call
+    if prompt := (st.chat_input("Ask about our research...") or "").strip():
         st.session_state.messages.append({"role": "user", "content": prompt})
         st.chat_message("user").markdown(prompt)
 
-        with st.spinner("Thinking..."):
+        with st.chat_message("assistant"):
             try:
-                response = get_response(prompt)
+                with st.spinner("Searching documents..."):
+                    history = get_model_history()
+                response = st.write_stream(
+                    stream_with_spinner(
+                        get_response_stream(
+                            prompt,
+                            history,
+                            st.session_state.history_summary,
+                            detailed=st.session_state.get("detailed_answers", False),
+                        )
+                    )
+                )
             except FileNotFoundError as exc:
                 response = (
                     "No files found in the knowledge base. Please add PDFs or text files to "
                     "`assets/knowledge_base/`."
                 )
                 st.error(str(exc))
+                st.markdown(response)
             except Exception as exc:
                 response = f"Something went wrong: {str(exc)}"
                 st.error(str(exc))
+                st.markdown(response)
 
         st.session_state.messages.append({"role": "assistant", "content": response})
-        st.chat_message("assistant").markdown(response)
+        save_chat()
+        if update_history_summary():
+            save_chat()
 
 
 def main():
-    show_sidebar()
     init_session_state()
+    show_sidebar()
     render_chat()
 
 
@@ -15,19 +15,39 @@ Setup:
 """
 
 import os
-from typing import Optional
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional
 
 import streamlit as st
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+
+@st.cache_resource(show_spinner=False)
+def load_environment():
+    """Load environment variables from .env once per process, not on every rerun."""
+    load_dotenv()
+
+
+load_environment()
 
 # Configuration
 FILE_SEARCH_STORE_NAME = "hickey-lab-knowledge-base"
+# Optional resource name (e.g. "fileSearchStores/hickey-lab-knowledge-base-abc123")
+# lets us fetch the store directly instead of scanning the store list.
+FILE_SEARCH_STORE_ID = os.getenv("FILE_SEARCH_STORE_ID")
+# Last resolved store resource name, so restarts can skip the store-list scan
+STORE_ID_CACHE = Path(__file__).resolve().parent / ".store_id"
 MODEL_NAME = "gemini-2.5-flash"
+MAX_OUTPUT_TOKENS = 512  # Short, plain-language answers
+TEMPERATURE = 0.2
 
 SYSTEM_PROMPT = """You are a warm, caring assistant for anyone curious about the Hickey Lab at Duke University.
 Explain spatial omics and our research in friendly, plain language while staying accurate.
@@ -40,6 +60,20 @@ When answering:
 - Use accessible language for non-experts
 """
 
+SUMMARY_PROMPT = """Summarize the following conversation between a visitor and the Hickey Lab assistant.
+Keep the topics, named methods, papers, and any open questions, in a few short sentences."""
+
+MAX_TURNS = 10  # Recent exchanges sent verbatim; older ones are folded into a summary
+HISTORY_CHAR_BUDGET = 8000  # Soft cap on history text per request (~2k tokens)
+# Shown when the model returns no text; failed replies are left out of later requests
+NO_ANSWER_MESSAGE = "Sorry, I couldn't come up with an answer to that. Could you try rephrasing?"
+FAILED_REPLY_PREFIXES = ("❌ Error:", "⚠️ File Search store not found")
+
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_TTL = 3600  # Seconds
+INDEXED_FILES_TTL = 600  # Seconds between refreshes of the sidebar file list
+IN_FLIGHT_WAIT = 60  # Max seconds to wait on another session answering the same question
+
 # --------------------------------------------------------------------------
 # Gemini Client & File Search
 # --------------------------------------------------------------------------
@@ -54,53 +88,395 @@ def get_client():
     return genai.Client(api_key=api_key)
 
 
-@st.cache_resource
-def get_file_search_store():
-    """Get the File Search store (cached)."""
-    client = get_client()
+def _load_cached_store_id() -> Optional[str]:
+    """Read the store resource name saved by a previous run, if any."""
+    try:
+        return STORE_ID_CACHE.read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+def _save_cached_store_id(store_name: str):
+    """Remember the store resource name for the next cold start."""
+    try:
+        STORE_ID_CACHE.write_text(store_name, encoding="utf-8")
+    except OSError:
+        pass  # Read-only or ephemeral disk; we'll just scan again next time
+
+
+def _find_store(client):
+    """Resolve the File Search store.
+    
+    Tries a direct get() on the configured or previously saved resource name
+    before falling back to scanning all stores by display name.
+    """
+    for store_id in (FILE_SEARCH_STORE_ID, _load_cached_store_id()):
+        if not store_id:
+            continue
+        try:
+            return client.file_search_stores.get(name=store_id)
+        except Exception:
+            pass  # Stale or wrong ID; try the next option
     for store in client.file_search_stores.list():
         if store.display_name == FILE_SEARCH_STORE_NAME:
+            _save_cached_store_id(store.name)
             return store
     return None
 
 
-def get_response(question: str) -> str:
-    """Generate a response using Gemini with File Search."""
+def _list_indexed_files(client) -> Optional[list[str]]:
+    """List the display names of indexed files, or None if the listing failed."""
+    try:
+        return [f.display_name for f in client.files.list()]
+    except Exception:
+        return None  # Not [], which would be cached as "nothing indexed"
+
+
+@st.cache_resource
+def prefetch_api_state():
+    """Resolve the store and list indexed files in parallel on first load (cached).
+    
+    The two lookups are independent round-trips, so overlapping them makes
+    startup take as long as the slower one rather than both combined. A
+    failed file listing comes back as None so it is never served as fresh.
+    """
+    client = get_client()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        store_future = executor.submit(_find_store, client)
+        files_future = executor.submit(_list_indexed_files, client)
+        return store_future.result(), files_future.result(), time.monotonic()
+
+
+def get_file_search_store():
+    """Get the File Search store."""
+    return prefetch_api_state()[0]
+
+
+def get_store_name() -> Optional[str]:
+    """Get the File Search store's resource name, resolved once per session."""
+    if "fs_store_name" not in st.session_state:
+        store = get_file_search_store()
+        if not store:
+            return None
+        st.session_state.fs_store_name = store.name
+    return st.session_state.fs_store_name
+
+
+class AnswerCache:
+    """Thread-safe LRU of recent answers with a time-to-live.
+    
+    Also tracks questions currently being answered, so concurrent identical
+    questions share one Gemini call.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._in_flight: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, answer = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return answer
+
+    def put(self, key, answer: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def begin(self, key) -> Optional[threading.Event]:
+        """Claim a key for answering.
+        
+        Returns None if the caller should answer it (and call finish() after),
+        or an event that is set once the session already answering it is done.
+        """
+        with self._lock:
+            event = self._in_flight.get(key)
+            if event is None:
+                self._in_flight[key] = threading.Event()
+            return event
+
+    def finish(self, key):
+        """Release a key claimed with begin() and wake anyone waiting on it."""
+        with self._lock:
+            event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    """Answers to standalone questions, shared across sessions (cached)."""
+    return AnswerCache()
+
+
+def normalize_question(question: str) -> str:
+    """Normalize case and whitespace so trivially different questions share a cache entry."""
+    return re.sub(r"\s+", " ", question.strip().lower())
+
+
+def _budget_start(history: list[dict], char_budget: int) -> int:
+    """Index where the most recent whole exchanges fitting within char_budget begin."""
+    total = 0
+    start = len(history)
+    while start >= 2:
+        size = len(history[start - 2]["content"]) + len(history[start - 1]["content"])
+        if total + size > char_budget:
+            break
+        total += size
+        start -= 2
+    return start
+
+
+def history_cut(
+    history: list[dict],
+    max_turns: int = MAX_TURNS,
+    char_budget: int = HISTORY_CHAR_BUDGET,
+) -> int:
+    """Pick how many of the oldest messages to fold into the conversation summary.
+    
+    Returns 0 while history fits in max_turns exchanges and char_budget
+    characters. Past either limit, the cut (whole exchanges) leaves room to
+    grow, half the turns or half the budget, so the summary is refreshed every
+    few turns rather than every turn. The newest exchange is always kept.
+    """
+    cut = 0
+    if len(history) > 2 * max_turns:
+        cut = len(history) // 4 * 2
+    if sum(len(message["content"]) for message in history[cut:]) > char_budget:
+        cut = max(cut, _budget_start(history, char_budget // 2))
+    return min(cut, max(len(history) - 2, 0))
+
+
+def trim_history(history: list[dict], char_budget: int = HISTORY_CHAR_BUDGET) -> list[dict]:
+    """Keep the most recent whole exchanges that fit within char_budget.
+    
+    The newest exchange is always kept; if it alone is over budget, each of
+    its messages is shortened to half the budget.
+    """
+    start = _budget_start(history, char_budget)
+    if start < len(history) or len(history) < 2:
+        return history[start:]
+    limit = char_budget // 2
+    return [
+        {**message, "content": message["content"][:limit] + "…"}
+        if len(message["content"]) > limit else message
+        for message in history[-2:]
+    ]
+
+
+def is_failed_reply(text: str) -> bool:
+    """Check whether an assistant message is a blank, error or no-answer reply."""
+    text = text.strip()
+    return not text or text == NO_ANSWER_MESSAGE or text.startswith(FAILED_REPLY_PREFIXES)
+
+
+def replayable_history(history: list[dict]) -> list[dict]:
+    """Drop exchanges whose reply failed, along with the question that led to them.
+    
+    Empty text parts are rejected by the API, and replaying error messages
+    would only teach the model to repeat them.
+    """
+    kept = []
+    for message in history:
+        if message["role"] != "user" and is_failed_reply(message["content"]):
+            if kept and kept[-1]["role"] == "user":
+                kept.pop()  # Keep user/model turns alternating
+            continue
+        kept.append(message)
+    return kept
+
+
+def build_contents(question: str, history: list[dict]) -> list[types.Content]:
+    """Convert chat history plus the new question into Gemini multi-turn contents."""
+    contents = [
+        types.Content(
+            role="user" if message["role"] == "user" else "model",
+            parts=[types.Part(text=message["content"])],
+        )
+        for message in trim_history(replayable_history(history))
+    ]
+    contents.append(types.Content(role="user", parts=[types.Part(text=question)]))
+    return contents
+
+
+def summarize_conversation(messages: list[dict], previous_summary: str = "") -> str:
+    """Condense older chat turns (and any earlier summary) into a short summary."""
     client = get_client()
-    store = get_file_search_store()
+    transcript = "\n\n".join(
+        f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}"
+        for m in messages
+    )
+    if previous_summary:
+        transcript = f"Earlier summary: {previous_summary}\n\n{transcript}"
     
-    if not store:
-        return "⚠️ File Search store not found. Please set up the knowledge base first."
+    response = client.models.generate_content(
+        model=MODEL_NAME,
+        contents=f"{SUMMARY_PROMPT}\n\n{transcript}",
+    )
+    return response.text or previous_summary
+
+
+def get_model_history() -> list[dict]:
+    """Get the recent turns to send with the latest prompt.
     
+    These are the turns not yet folded into st.session_state.history_summary
+    (see update_history_summary), capped at MAX_TURNS exchanges.
+    """
+    # Everything after the summarized prefix, minus the prompt just appended
+    history = st.session_state.messages[st.session_state.summarized_count:-1]
+    return history[-2 * MAX_TURNS:]
+
+
+def update_history_summary() -> bool:
+    """Fold the oldest turns into the conversation summary once history outgrows its limits.
+    
+    Keeps at most MAX_TURNS exchanges, and HISTORY_CHAR_BUDGET characters,
+    verbatim; anything older goes into st.session_state.history_summary (the
+    displayed transcript is left untouched). Called after an answer has been
+    shown, so the extra Gemini call never delays the reply. Returns True if the
+    summary changed.
+    """
+    history = st.session_state.messages[st.session_state.summarized_count:]
+    cut = history_cut(history)  # Whole user/assistant exchanges only
+    if not cut:
+        return False
     try:
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=question,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                tools=[
-                    types.Tool(
-                        file_search=types.FileSearch(
-                            file_search_store_names=[store.name]
-                        )
-                    )
-                ]
-            )
+        st.session_state.history_summary = summarize_conversation(
+            history[:cut], st.session_state.history_summary
         )
-        return response.text
+    except Exception:
+        return False  # Try again after the next answer
+    st.session_state.summarized_count += cut
+    return True
+
+
+@lru_cache(maxsize=64)
+def _generation_config(store_name: str, summary: str) -> types.GenerateContentConfig:
+    """Build (once per store and summary) the File Search config for a question."""
+    system_instruction = SYSTEM_PROMPT
+    if summary:
+        system_instruction += f"\nSummary of the conversation so far:\n{summary}\n"
+    
+    return types.GenerateContentConfig(
+        system_instruction=system_instruction,
+        tools=[
+            types.Tool(
+                file_search=types.FileSearch(
+                    file_search_store_names=[store_name]
+                )
+            )
+        ],
+        max_output_tokens=MAX_OUTPUT_TOKENS,
+        temperature=TEMPERATURE,
+        # Thinking adds latency without helping document-grounded Q&A
+        thinking_config=types.ThinkingConfig(thinking_budget=0),
+    )
+
+
+def _stream_answer(client, store_name: str, question: str, history: list[dict], summary: str) -> Iterator[str]:
+    """Call Gemini with File Search and yield the answer's text chunks."""
+    stream = client.models.generate_content_stream(
+        model=MODEL_NAME,
+        contents=build_contents(question, history),
+        config=_generation_config(store_name, summary),
+    )
+    for chunk in stream:
+        if chunk.text:
+            yield chunk.text
+
+
+def get_response(question: str, history: list[dict], summary: str = "") -> Iterator[str]:
+    """Stream a response using Gemini with File Search, yielding text chunks.
+    
+    Answers to questions asked without prior conversation are cached per store,
+    so repeats (common for FAQ-style questions) skip the Gemini call. If another
+    session is already answering the same question, we wait for its answer
+    instead of making a second call.
+    """
+    client = get_client()
+    store_name = get_store_name()
+    
+    if not store_name:
+        yield "⚠️ File Search store not found. Please set up the knowledge base first."
+        return
+    
+    # Follow-ups depend on the conversation, so only standalone questions are cached
+    cache = get_answer_cache()
+    cache_key = None
+    leader = False
+    if not history and not summary:
+        cache_key = (store_name, normalize_question(question))
+        answer = cache.get(cache_key)
+        if answer is None:
+            in_flight = cache.begin(cache_key)
+            if in_flight is None:
+                leader = True
+            else:
+                in_flight.wait(timeout=IN_FLIGHT_WAIT)
+                answer = cache.get(cache_key)  # Still None if that call failed
+        if answer is not None:
+            yield answer
+            return
+    
+    try:
+        parts = []
+        for text in _stream_answer(client, store_name, question, history, summary):
+            parts.append(text)
+            yield text
+        if not parts:
+            yield NO_ANSWER_MESSAGE  # Never leave an empty reply in the chat
+        elif cache_key:
+            cache.put(cache_key, "".join(parts))
     except Exception as e:
-        return f"❌ Error: {str(e)}"
+        yield f"❌ Error: {str(e)}"
+    finally:
+        if leader:
+            cache.finish(cache_key)
+
+
+@st.cache_data(ttl=INDEXED_FILES_TTL, show_spinner=False)
+def _fetch_indexed_files() -> list[str]:
+    """List indexed file names, refreshed at most every INDEXED_FILES_TTL seconds."""
+    return [f.display_name for f in get_client().files.list()]
 
 
 def get_indexed_files() -> list[str]:
     """Get list of indexed file names."""
-    client = get_client()
     try:
-        return [f.display_name for f in client.files.list()]
+        _, files, fetched_at = prefetch_api_state()
+        if files is not None and time.monotonic() - fetched_at < INDEXED_FILES_TTL:
+            return files
+        return _fetch_indexed_files()
     except Exception:
         return []
 
 
+def stream_with_spinner(chunks: Iterator[str], message: str = "Searching documents...") -> Iterator[str]:
+    """Show a spinner until the first chunk arrives, then pass the stream through.
+    
+    The first chunk can take a while (store setup, uploads, retrieval), so the
+    visitor sees progress instead of an empty message.
+    """
+    with st.spinner(message):
+        first = next(chunks, None)
+    if first is None:
+        return
+    yield first
+    yield from chunks
+
+
 # --------------------------------------------------------------------------
 # Streamlit UI
 # --------------------------------------------------------------------------
@@ -150,8 +526,8 @@ with st.sidebar:
     with st.expander("📚 Knowledge Base"):
         files = get_indexed_files()
         if files:
-            for f in files:
-                st.write(f"• {f}")
+            # One markdown element for the whole list rather than one per file
+            st.markdown("\n".join(f"- {f}" for f in files))
         else:
             st.write("No files indexed yet.")
     
@@ -163,23 +539,32 @@ with st.sidebar:
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+# Older turns are summarized once instead of being re-sent every turn
+if "history_summary" not in st.session_state:
+    st.session_state.history_summary = ""
+    st.session_state.summarized_count = 0
+
 # Display chat history
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
-# Chat input
-if prompt := st.chat_input("Ask about our research..."):
+# Chat input (kept at top level so it stays pinned to the bottom of the page)
+# Whitespace-only input is dropped before any model call
+if prompt := (st.chat_input("Ask about our research...") or "").strip():
     # Add user message
     st.session_state.messages.append({"role": "user", "content": prompt})
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Generate response
+    # Stream response as it is generated
     with st.chat_message("assistant"):
         with st.spinner("Searching documents..."):
-            response = get_response(prompt)
-        st.markdown(response)
+            history = get_model_history()
+        response = st.write_stream(
+            stream_with_spinner(get_response(prompt, history, st.session_state.history_summary))
+        )
     
     # Add assistant response
     st.session_state.messages.append({"role": "assistant", "content": response})
+    update_history_summary()
@@ -1,9 +1,12 @@
 """Core RAG pipeline for the Hickey Lab AI Assistant."""
 
+import threading
+from functools import lru_cache
 from pathlib import Path
 from typing import List
 
 from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableSequence
 from langchain_core.runnables import RunnablePassthrough
@@ -20,6 +23,33 @@ SYSTEM_PROMPT = (
     "Use the provided context to ground answers; if it is insufficient, gently say you don't have that info yet and invite another question."
 )
 
+# Global cache
+_chain = None
+_chain_lock = threading.Lock()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Embeddings wrapper that remembers query vectors.
+
+    Each question is embedded through the API before retrieval; repeated
+    questions reuse the cached vector instead. Document embedding is passed
+    straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, maxsize: int = 1024):
+        self._embeddings = embeddings
+        self._cached_query = lru_cache(maxsize=maxsize)(self._embed_query)
+
+    def _embed_query(self, text: str) -> tuple:
+        # Tuples so callers can't mutate a cached vector
+        return tuple(self._embeddings.embed_query(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return list(self._cached_query(text.strip()))
+
 
 def load_vectorstore(persist_dir: Path = CHROMA_DIR):
     """Load the persisted Chroma store."""
@@ -27,7 +57,7 @@ def load_vectorstore(persist_dir: Path = CHROMA_DIR):
         raise FileNotFoundError(
             f"Vector store not found at {persist_dir}. Run src/ingest.py first."
         )
-    embeddings = OpenAIEmbeddings()
+    embeddings = CachedQueryEmbeddings(OpenAIEmbeddings())
     return Chroma(
         persist_directory=str(persist_dir),
         embedding_function=embeddings,
@@ -63,9 +93,22 @@ def build_chain():
     return chain
 
 
+def get_chain():
+    """Get the retrieval chain, building it once per process.
+
+    Opening Chroma and creating the OpenAI clients is setup work, so it is
+    kept out of the per-question path.
+    """
+    global _chain
+    if _chain is None:
+        with _chain_lock:
+            if _chain is None:
+                load_dotenv()
+                _chain = build_chain()
+    return _chain
+
+
 def get_response(user_question: str) -> str:
     """Return a model response grounded in the vector store."""
-    load_dotenv()
-    chain = build_chain()
-    response = chain.invoke(user_question)
+    response = get_chain().invoke(user_question)
     return response.content
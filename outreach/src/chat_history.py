@@ -0,0 +1,132 @@
+"""Persist chat sessions to small JSON files so they survive app restarts.
+
+Each browser session gets an ID. Only once the visitor asks for a link to
+their chat do the apps put that ID in the page URL and write its messages to
+.sessions/<id>.json after every turn. Writes happen on a background thread so
+the chat never waits on disk, and sessions idle for longer than SESSION_TTL
+are deleted.
+"""
+
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from .fileio import atomic_write_text
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SESSIONS_DIR = ROOT_DIR / ".sessions"
+SESSION_TTL = 7 * 24 * 3600  # Seconds since its last save before a session expires
+PRUNE_INTERVAL = 3600  # Min seconds between sweeps for expired sessions
+
+# IDs come back from the URL and end up in a file name, so only accept plain hex
+_SESSION_ID_RE = re.compile(r"[0-9a-f]{8,32}")
+
+# A single worker keeps writes to the same session in order
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-history")
+
+# Latest unwritten snapshot per session; newer saves replace queued ones
+_pending: dict[str, str] = {}
+_pending_lock = threading.Lock()
+_last_prune: Optional[float] = None  # time.monotonic() of the last sweep
+
+
+def new_session_id() -> str:
+    """Create a new random session ID."""
+    return secrets.token_hex(8)
+
+
+def is_valid_session_id(session_id: Optional[str]) -> bool:
+    """Check that a session ID is safe to use as a file name."""
+    return bool(session_id) and _SESSION_ID_RE.fullmatch(session_id) is not None
+
+
+def _session_path(session_id: str) -> Path:
+    if not is_valid_session_id(session_id):
+        raise ValueError(f"Invalid session ID: {session_id!r}")
+    return SESSIONS_DIR / f"{session_id}.json"
+
+
+def load_session(session_id: str) -> dict:
+    """Load a saved session, or return an empty dict if there isn't one."""
+    path = _session_path(session_id)
+    try:
+        if _is_expired(path, time.time()):
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Could not load session {session_id}: {e}")
+        return {}
+
+
+def _is_expired(path: Path, now: float, max_age: float = SESSION_TTL) -> bool:
+    return now - path.stat().st_mtime > max_age
+
+
+def prune_sessions(max_age: float = SESSION_TTL) -> int:
+    """Delete saved sessions (and leftover temp files) not written for max_age seconds.
+    
+    Returns the number of files removed.
+    """
+    now = time.time()
+    removed = 0
+    try:
+        entries = list(os.scandir(SESSIONS_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if not entry.name.endswith((".json", ".tmp")):
+            continue
+        try:
+            if _is_expired(Path(entry.path), now, max_age):
+                os.unlink(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass  # Rewritten or removed since the scan
+        except OSError as e:
+            print(f"Warning: Could not prune session file {entry.name}: {e}")
+    return removed
+
+
+def _write_session(session_id: str, path: Path):
+    with _pending_lock:
+        payload = _pending.pop(session_id, None)
+    if payload is None:
+        return
+    
+    try:
+        SESSIONS_DIR.mkdir(exist_ok=True)
+        atomic_write_text(path, payload)
+    except OSError as e:
+        print(f"Warning: Could not save session {session_id}: {e}")
+
+
+def save_session(session_id: str, data: dict) -> None:
+    """Queue a session to be written to disk, replacing any earlier copy atomically.
+    
+    If a write for this session is still queued, it just picks up the newer
+    data, so bursts of saves cost a single write.
+    """
+    path = _session_path(session_id)
+    # Serialize now, while the caller still owns the data, and write in the background
+    payload = json.dumps(data, separators=(",", ":"))
+    global _last_prune
+    with _pending_lock:
+        queued = session_id in _pending
+        _pending[session_id] = payload
+        now = time.monotonic()
+        prune = _last_prune is None or now - _last_prune > PRUNE_INTERVAL
+        if prune:
+            _last_prune = now
+    if not queued:
+        _writer.submit(_write_session, session_id, path)
+    if prune:
+        _writer.submit(prune_sessions)
@@ -0,0 +1,28 @@
+"""Small file helpers shared by the apps and tools/manage_store.py."""
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Replace path with text atomically.
+    
+    Writes to a uniquely named temp file beside path first, so concurrent
+    writers (the app's threads, or the app and the CLI) never share one and
+    readers never see a half-written file.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w",
+        encoding="utf-8",
+        dir=path.parent,
+        prefix=f"{path.name}.",
+        suffix=".tmp",
+        delete=False,
+    ) as tmp:
+        tmp.write(text)
+    try:
+        os.replace(tmp.name, path)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
@@ -4,19 +4,35 @@ Uses the new File Search tool which provides semantic search over uploaded docum
 Docs: https://ai.google.dev/gemini-api/docs/file-search
 """
 
+import hashlib
+import json
 import os
+import random
+import re
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 
+from .fileio import atomic_write_text
+
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 ASSETS_DIR = ROOT_DIR / "assets" / "knowledge_base"
 FILE_SEARCH_STORE_NAME = "hickey-lab-knowledge-base"
+# {file name: {sha256, mtime_ns, size}} of indexed files; tools/manage_store.py
+# reads and writes the same file, so uploads from either side are seen by both
+MANIFEST_PATH = ROOT_DIR / ".index_manifest.json"
+REMOTE_NAMES_PATH = ROOT_DIR / ".remote_names.json"  # Last listing of indexed file names
+REMOTE_NAMES_MAX_AGE = 300  # Seconds a cached listing is trusted before re-listing
+SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".md"}
 
 SYSTEM_PROMPT = """You are a warm, caring assistant for anyone curious about the Hickey Lab at Duke University.
 Explain spatial omics and our research in friendly, plain language while staying accurate.
@@ -29,31 +45,84 @@ When answering:
 - Use accessible language for non-experts
 """
 
+SUMMARY_PROMPT = """Summarize the following conversation between a visitor and the Hickey Lab assistant.
+Keep the topics, named methods, papers, and any open questions, in a few short sentences."""
+
+UPLOAD_WORKERS = 6  # Uploads are network-bound, so a few threads overlap them well
+DELETE_WORKERS = 10  # Deletes are single small requests, so more can be in flight
+POLL_BASE_SECONDS = 0.5  # First wait while an upload is being indexed; doubles after each check
+# Answer tuning for plain-language Q&A: a capped reply with thinking disabled
+# keeps latency and cost down. detailed=True falls back to the model defaults.
+MAX_OUTPUT_TOKENS = 512
+TEMPERATURE = 0.2
+MAX_TURNS = 10  # Recent exchanges sent verbatim; older ones are folded into a summary
+HISTORY_CHAR_BUDGET = 8000  # Soft cap on history text per request (~2k tokens)
+# Shown when the model returns no text; failed replies are left out of later requests
+NO_ANSWER_MESSAGE = "Sorry, I couldn't come up with an answer to that. Could you try rephrasing?"
+FAILED_REPLY_PREFIXES = ("Error generating response:", "Something went wrong:")
+# Outreach visitors often ask the same opening questions; identical standalone
+# questions within ANSWER_CACHE_TTL seconds are answered from memory
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_TTL = 300
+
 # Global cache
 _client: Optional[genai.Client] = None
 _file_search_store = None
 _files_checked = False  # Track if we've verified files are uploaded
+_last_local_fingerprint: Optional[str] = None  # Knowledge base state as of that check
+_knowledge_files_cache: Optional[tuple[int, list[Path]]] = None  # (dir mtime, files)
+
+# Streamlit runs each browser session on its own script thread, so Gemini calls
+# already proceed concurrently. The one-time setup above is shared, though, and
+# must not race (e.g. two sessions both creating the store on a cold start).
+_setup_lock = threading.RLock()
+
+# {(normalized question, detailed): (monotonic time stored, answer)}, oldest first
+_answer_cache: OrderedDict = OrderedDict()
+_answer_cache_lock = threading.Lock()
 
 
 def get_client() -> genai.Client:
-    """Get or create the Gemini client."""
+    """Get or create the Gemini client.
+    
+    Always go through this rather than constructing genai.Client directly: the
+    one client's HTTP connection pool is what lets uploads, status polls and
+    questions reuse open connections instead of a new TLS handshake each.
+    """
     global _client
     if _client is None:
-        load_dotenv()
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in .env file")
-        _client = genai.Client(api_key=api_key)
+        with _setup_lock:
+            if _client is None:
+                load_dotenv()
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise ValueError("GEMINI_API_KEY not found in .env file")
+                _client = genai.Client(api_key=api_key)
     return _client
 
 
 def get_knowledge_files() -> list[Path]:
-    """Get all supported files from the knowledge base."""
-    supported_extensions = {".pdf", ".txt", ".md"}
-    files = []
-    for ext in supported_extensions:
-        files.extend(ASSETS_DIR.glob(f"*{ext}"))
-    return sorted(files)
+    """Get all supported files from the knowledge base.
+    
+    The directory is scanned once and the result reused until its mtime
+    changes (files added, removed or renamed).
+    """
+    global _knowledge_files_cache
+    try:
+        mtime = ASSETS_DIR.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    
+    cached = _knowledge_files_cache
+    if cached is None or cached[0] != mtime:
+        with os.scandir(ASSETS_DIR) as entries:
+            files = sorted(
+                (Path(e.path) for e in entries
+                 if e.is_file() and Path(e.name).suffix.lower() in SUPPORTED_EXTENSIONS),
+                key=lambda p: p.name,
+            )
+        cached = _knowledge_files_cache = (mtime, files)
+    return list(cached[1])
 
 
 def get_or_create_file_search_store():
@@ -63,6 +132,16 @@ def get_or_create_file_search_store():
     if _file_search_store is not None:
         return _file_search_store
     
+    with _setup_lock:
+        if _file_search_store is not None:
+            return _file_search_store
+        return _find_or_create_store()
+
+
+def _find_or_create_store():
+    """Look up the store by display name, creating it if missing."""
+    global _file_search_store
+    
     client = get_client()
     
     # Check if store already exists
@@ -84,17 +163,145 @@ def get_or_create_file_search_store():
     return _file_search_store
 
 
+def _file_sha256(file_path: Path) -> str:
+    """Hash a file's contents without loading it all into memory."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _needs_upload(file_path: Path, manifest: dict) -> bool:
+    """Check with a stat call whether a file changed since it was indexed.
+    
+    Files without a manifest entry (indexed before it existed) count as current.
+    """
+    entry = manifest.get(file_path.name)
+    if not isinstance(entry, dict):
+        return False
+    stat = file_path.stat()
+    return (entry.get("mtime_ns"), entry.get("size")) != (stat.st_mtime_ns, stat.st_size)
+
+
+def _manifest_entry(file_path: Path, previous) -> dict:
+    """Fingerprint a file, reusing the recorded hash when mtime and size still match."""
+    stat = file_path.stat()
+    if isinstance(previous, dict) and (previous.get("mtime_ns"), previous.get("size")) == (
+        stat.st_mtime_ns, stat.st_size
+    ):
+        return previous
+    return {"sha256": _file_sha256(file_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _recorded_sha256(entry) -> Optional[str]:
+    """Get the hash from a manifest entry (older manifests stored it directly)."""
+    return entry.get("sha256") if isinstance(entry, dict) else entry
+
+
+def _load_manifest() -> dict:
+    """Load the record of what has been indexed: {file name: {sha256, mtime_ns, size}}."""
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Could not read index manifest: {e}")
+        return {}
+
+
+def _save_manifest(manifest: dict):
+    """Write the index manifest atomically."""
+    atomic_write_text(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def _remote_names(client, store_name: str, max_age: float = REMOTE_NAMES_MAX_AGE) -> set[str]:
+    """Get the display names of indexed files, re-listing at most every max_age seconds.
+    
+    Listing files is a paginated round-trip that grows with the corpus, so the
+    last result is kept in REMOTE_NAMES_PATH and reused across restarts.
+    """
+    try:
+        cached = json.loads(REMOTE_NAMES_PATH.read_text(encoding="utf-8"))
+        if cached["store_name"] == store_name and time.time() - cached["ts"] < max_age:
+            return set(cached["names"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    names = {f.display_name for f in client.files.list()}
+    try:
+        atomic_write_text(
+            REMOTE_NAMES_PATH,
+            json.dumps({"ts": time.time(), "store_name": store_name, "names": sorted(names)}),
+        )
+    except OSError as e:
+        print(f"Warning: Could not cache indexed file names: {e}")
+    return names
+
+
+def _invalidate_remote_names():
+    """Forget the cached listing after the store's contents change."""
+    REMOTE_NAMES_PATH.unlink(missing_ok=True)
+
+
+def _wait_for_operation(client, operation, base: float = POLL_BASE_SECONDS, cap: Optional[float] = None):
+    """Poll a long-running operation until it's done, with jittered exponential backoff.
+    
+    Short uploads are noticed soon after they finish, and parallel uploads
+    don't all poll the API in lockstep. The wait is capped at
+    POLL_CAP_SECONDS (default 8).
+    """
+    if cap is None:
+        cap = float(os.getenv("POLL_CAP_SECONDS", "8"))
+    attempt = 0
+    while not operation.done:
+        # Clamp the exponent: the cap is reached long before, and 2.0 ** 1024 overflows
+        time.sleep(random.uniform(0, min(cap, base * 2 ** min(attempt, 10))))
+        operation = client.operations.get(operation)
+        attempt += 1
+    return operation
+
+
+def _upload_file(client, store, file_path: Path) -> None:
+    """Upload one file to the store and wait for it to be indexed."""
+    print(f"Uploading: {file_path.name}")
+    operation = client.file_search_stores.upload_to_file_search_store(
+        file=str(file_path),
+        file_search_store_name=store.name,
+        config={
+            'display_name': file_path.name,
+        }
+    )
+    
+    # Wait for processing to complete
+    _wait_for_operation(client, operation)
+
+
 def upload_files_to_file_search_store(force_reupload: bool = False) -> dict:
     """Upload knowledge base files to the File Search store.
     
-    Only uploads files that aren't already in the store (smart sync).
-    Set force_reupload=True to re-upload everything.
+    Only uploads files that aren't already in the store, or whose contents
+    changed since they were indexed (tracked by SHA-256 in MANIFEST_PATH,
+    re-hashed only when a file's mtime or size moves); stale copies of
+    changed files are deleted first. Set force_reupload=True to re-upload
+    everything. Files are uploaded concurrently, up to UPLOAD_CONCURRENCY
+    (default UPLOAD_WORKERS) at a time.
+    
+    Holds _setup_lock throughout, so a manual re-index never races the
+    automatic check in ensure_files_uploaded.
     """
-    global _files_checked
+    with _setup_lock:
+        return _upload_files(force_reupload)
+
+
+def _upload_files(force_reupload: bool) -> dict:
+    global _files_checked, _last_local_fingerprint
     
     client = get_client()
     store = get_or_create_file_search_store()
     
+    # Taken before reading the files, so edits made mid-upload are caught next time
+    fingerprint = _local_fingerprint()
     files_to_upload = get_knowledge_files()
     if not files_to_upload:
         raise FileNotFoundError(
@@ -110,92 +317,348 @@ def upload_files_to_file_search_store(force_reupload: bool = False) -> dict:
         print(f"Warning: Could not list existing files: {e}")
     
     results = {"uploaded": [], "skipped": [], "failed": []}
+    manifest = _load_manifest()
+    entries = {}
     
+    pending = []
     for file_path in files_to_upload:
-        # Skip if already exists and not forcing re-upload
-        if file_path.name in existing_files and not force_reupload:
-            print(f"Skipping (already indexed): {file_path.name}")
-            results["skipped"].append(file_path.name)
-            continue
-            
-        print(f"Uploading: {file_path.name}")
-        try:
-            operation = client.file_search_stores.upload_to_file_search_store(
-                file=str(file_path),
-                file_search_store_name=store.name,
-                config={
-                    'display_name': file_path.name,
-                }
-            )
-            
-            # Wait for processing to complete
-            while not operation.done:
-                time.sleep(2)
-                operation = client.operations.get(operation)
-            
-            print(f"  ✓ Uploaded and indexed: {file_path.name}")
-            results["uploaded"].append(file_path.name)
-        except Exception as e:
-            print(f"  ✗ Failed: {file_path.name} - {e}")
-            results["failed"].append({"file": file_path.name, "error": str(e)})
+        previous = manifest.get(file_path.name)
+        entry = entries[file_path.name] = _manifest_entry(file_path, previous)
+        remote = existing_files.get(file_path.name)
+        
+        # Skip if already indexed and unchanged (files indexed before the
+        # manifest existed are assumed current), unless forcing re-upload
+        if remote and not force_reupload:
+            if previous is None or _recorded_sha256(previous) == entry["sha256"]:
+                print(f"Skipping (already indexed): {file_path.name}")
+                results["skipped"].append(file_path.name)
+                manifest[file_path.name] = entry
+                continue
+        
+        # Remove the stale copy so the store doesn't hold two versions. The old
+        # manifest entry stays until the new upload succeeds, so a failure is retried.
+        if remote:
+            try:
+                client.files.delete(name=remote.name)
+                print(f"Removed previous version: {file_path.name}")
+            except Exception as e:
+                print(f"Warning: Could not delete previous version of {file_path.name}: {e}")
+        pending.append(file_path)
+    
+    # Read at call time so a value from .env (loaded by get_client) applies
+    workers = max(1, int(os.getenv("UPLOAD_CONCURRENCY", UPLOAD_WORKERS)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_upload_file, client, store, file_path): file_path
+            for file_path in pending
+        }
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                future.result()
+                print(f"  ✓ Uploaded and indexed: {file_path.name}")
+                results["uploaded"].append(file_path.name)
+                manifest[file_path.name] = entries[file_path.name]
+            except Exception as e:
+                print(f"  ✗ Failed: {file_path.name} - {e}")
+                results["failed"].append({"file": file_path.name, "error": str(e)})
+    
+    try:
+        _save_manifest(manifest)
+    except OSError as e:
+        print(f"Warning: Could not write index manifest: {e}")
+    if pending:
+        _invalidate_remote_names()
+        clear_answer_cache()
     
     _files_checked = True
+    _last_local_fingerprint = fingerprint
     return results
 
 
+def _local_fingerprint() -> str:
+    """Summarize the knowledge base's names, sizes and mtimes (one stat per file)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for file_path in get_knowledge_files():
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            continue
+        digest.update(f"{file_path.name}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
 def ensure_files_uploaded():
-    """Ensure files are uploaded, but only check once per session."""
-    global _files_checked
+    """Ensure files are uploaded, checking the store again only when local files change."""
+    global _files_checked, _last_local_fingerprint
+    
+    if _files_checked and _local_fingerprint() == _last_local_fingerprint:
+        return
     
-    if not _files_checked:
+    with _setup_lock:
+        fingerprint = _local_fingerprint()
+        if _files_checked and fingerprint == _last_local_fingerprint:
+            return
+        
         # Check if store has any files, if not upload
         client = get_client()
-        existing_files = list(client.files.list())
+        store = get_or_create_file_search_store()
+        remote_files = _remote_names(client, store.name)
         
-        if not existing_files:
+        if not remote_files:
             print("No files in store, uploading...")
             upload_files_to_file_search_store()
         else:
-            # Just check for new files without re-uploading existing
-            local_files = {f.name for f in get_knowledge_files()}
-            remote_files = {f.display_name for f in existing_files}
+            # Check for new or edited files (a stat per file, no hashing)
+            knowledge_files = get_knowledge_files()
+            local_files = {f.name for f in knowledge_files}
+            manifest = _load_manifest()
             
             new_files = local_files - remote_files
-            if new_files:
-                print(f"Found {len(new_files)} new files to upload: {new_files}")
+            changed_files = {f.name for f in knowledge_files if _needs_upload(f, manifest)}
+            if new_files or changed_files:
+                print(f"Found {len(new_files)} new and {len(changed_files)} changed files to upload: "
+                      f"{new_files | changed_files}")
                 upload_files_to_file_search_store()
             else:
                 print(f"All {len(remote_files)} files already indexed, skipping upload.")
         
         _files_checked = True
+        _last_local_fingerprint = fingerprint
 
 
-def get_response(user_question: str) -> str:
-    """Generate a response using Gemini with File Search."""
+def _budget_start(history: list[dict], char_budget: int) -> int:
+    """Index where the most recent whole exchanges fitting within char_budget begin."""
+    total = 0
+    start = len(history)
+    while start >= 2:
+        size = len(history[start - 2]["content"]) + len(history[start - 1]["content"])
+        if total + size > char_budget:
+            break
+        total += size
+        start -= 2
+    return start
+
+
+def history_cut(
+    history: list[dict],
+    max_turns: int = MAX_TURNS,
+    char_budget: int = HISTORY_CHAR_BUDGET,
+) -> int:
+    """Pick how many of the oldest messages to fold into the conversation summary.
+    
+    Returns 0 while history fits in max_turns exchanges and char_budget
+    characters. Past either limit, the cut (whole exchanges) leaves room to
+    grow, half the turns or half the budget, so the summary is refreshed every
+    few turns rather than every turn. The newest exchange is always kept.
+    """
+    cut = 0
+    if len(history) > 2 * max_turns:
+        cut = len(history) // 4 * 2
+    if sum(len(message["content"]) for message in history[cut:]) > char_budget:
+        cut = max(cut, _budget_start(history, char_budget // 2))
+    return min(cut, max(len(history) - 2, 0))
+
+
+def _trim_history(history: list[dict], char_budget: int = HISTORY_CHAR_BUDGET) -> list[dict]:
+    """Keep the most recent whole exchanges that fit within char_budget.
+    
+    The newest exchange is always kept; if it alone is over budget, each of
+    its messages is shortened to half the budget.
+    """
+    start = _budget_start(history, char_budget)
+    if start < len(history) or len(history) < 2:
+        return history[start:]
+    limit = char_budget // 2
+    return [
+        {**message, "content": message["content"][:limit] + "…"}
+        if len(message["content"]) > limit else message
+        for message in history[-2:]
+    ]
+
+
+def _is_failed_reply(text: str) -> bool:
+    """Check whether an assistant message is a blank, error or no-answer reply."""
+    text = text.strip()
+    return not text or text == NO_ANSWER_MESSAGE or text.startswith(FAILED_REPLY_PREFIXES)
+
+
+def _replayable_history(history: list[dict]) -> list[dict]:
+    """Drop exchanges whose reply failed, along with the question that led to them.
+    
+    Empty text parts are rejected by the API, and replaying error messages
+    would only teach the model to repeat them.
+    """
+    kept = []
+    for message in history:
+        if message["role"] != "user" and _is_failed_reply(message["content"]):
+            if kept and kept[-1]["role"] == "user":
+                kept.pop()  # Keep user/model turns alternating
+            continue
+        kept.append(message)
+    return kept
+
+
+def _build_contents(user_question: str, history: Optional[list[dict]] = None) -> list[types.Content]:
+    """Convert chat history plus the new question into Gemini multi-turn contents."""
+    contents = [
+        types.Content(
+            role="user" if message["role"] == "user" else "model",
+            parts=[types.Part(text=message["content"])],
+        )
+        for message in _trim_history(_replayable_history(history or []))
+    ]
+    contents.append(types.Content(role="user", parts=[types.Part(text=user_question)]))
+    return contents
+
+
+def _system_instruction(summary: str = "") -> str:
+    """Get the system prompt, with a summary of earlier turns if there is one."""
+    if not summary:
+        return SYSTEM_PROMPT
+    return f"{SYSTEM_PROMPT}\nSummary of the conversation so far:\n{summary}\n"
+
+
+@lru_cache(maxsize=64)
+def _generation_config(
+    store_name: str,
+    summary: str = "",
+    detailed: bool = False,
+) -> types.GenerateContentConfig:
+    """Build the File Search generation config for a question.
+    
+    Cached, since the same store (and usually the same summary) is used for
+    every question; treat the result as read-only.
+    """
+    tuning = {}
+    if not detailed:
+        tuning = {
+            "max_output_tokens": MAX_OUTPUT_TOKENS,
+            "temperature": TEMPERATURE,
+            "thinking_config": types.ThinkingConfig(thinking_budget=0),
+        }
+    return types.GenerateContentConfig(
+        system_instruction=_system_instruction(summary),
+        tools=[
+            types.Tool(
+                file_search=types.FileSearch(
+                    file_search_store_names=[store_name]
+                )
+            )
+        ],
+        **tuning,
+    )
+
+
+def summarize_conversation(messages: list[dict], previous_summary: str = "") -> str:
+    """Condense older chat turns (and any earlier summary) into a short summary."""
+    client = get_client()
+    
+    transcript = "\n\n".join(
+        f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}"
+        for m in messages
+    )
+    if previous_summary:
+        transcript = f"Earlier summary: {previous_summary}\n\n{transcript}"
+    
+    response = client.models.generate_content(
+        model="gemini-2.5-flash",
+        contents=f"{SUMMARY_PROMPT}\n\n{transcript}",
+    )
+    return response.text or previous_summary
+
+
+def _answer_cache_key(user_question: str, detailed: bool) -> tuple[str, bool]:
+    """Normalize case and whitespace so trivially different questions share an entry."""
+    return re.sub(r"\s+", " ", user_question.strip().lower()), detailed
+
+
+def _get_cached_answer(key) -> Optional[str]:
+    with _answer_cache_lock:
+        entry = _answer_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, answer = entry
+        if time.monotonic() - stored_at > ANSWER_CACHE_TTL:
+            del _answer_cache[key]
+            return None
+        _answer_cache.move_to_end(key)
+        return answer
+
+
+def _put_cached_answer(key, answer: str):
+    with _answer_cache_lock:
+        _answer_cache[key] = (time.monotonic(), answer)
+        _answer_cache.move_to_end(key)
+        while len(_answer_cache) > ANSWER_CACHE_SIZE:
+            _answer_cache.popitem(last=False)
+
+
+def clear_answer_cache():
+    """Drop all cached answers, e.g. after the indexed documents change."""
+    with _answer_cache_lock:
+        _answer_cache.clear()
+
+
+def get_response_stream(
+    user_question: str,
+    history: Optional[list[dict]] = None,
+    summary: str = "",
+    detailed: bool = False,
+) -> Iterator[str]:
+    """Stream a response using Gemini with File Search, yielding text chunks.
+    
+    history is the recent chat turns ({"role", "content"} dicts) to send along
+    with the question; summary condenses anything older than that. Set
+    detailed=True to lift the output cap and let the model think.
+    
+    Standalone questions (no history or summary) are answered from a short-lived
+    cache when the same question was asked within ANSWER_CACHE_TTL seconds.
+    """
+    # Follow-ups depend on the conversation, so only standalone questions are cached
+    cache_key = None if history or summary else _answer_cache_key(user_question, detailed)
+    if cache_key is not None:
+        cached = _get_cached_answer(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
     client = get_client()
     store = get_or_create_file_search_store()
     
     # Smart check - only uploads if needed, skips if files already indexed
     ensure_files_uploaded()
     
+    chunks = []
     try:
-        response = client.models.generate_content(
+        stream = client.models.generate_content_stream(
             model="gemini-2.5-flash",
-            contents=user_question,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                tools=[
-                    types.Tool(
-                        file_search=types.FileSearch(
-                            file_search_store_names=[store.name]
-                        )
-                    )
-                ]
-            )
+            contents=_build_contents(user_question, history),
+            config=_generation_config(store.name, summary, detailed),
         )
-        return response.text
+        for chunk in stream:
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
     except Exception as e:
-        return f"Error generating response: {str(e)}"
+        yield f"Error generating response: {str(e)}"
+        return
+    
+    if not chunks:
+        yield NO_ANSWER_MESSAGE  # Never leave an empty reply in the chat
+        return
+    if cache_key is not None:
+        _put_cached_answer(cache_key, "".join(chunks))
+
+
+def get_response(
+    user_question: str,
+    history: Optional[list[dict]] = None,
+    summary: str = "",
+    detailed: bool = False,
+) -> str:
+    """Generate a response using Gemini with File Search."""
+    return "".join(get_response_stream(user_question, history, summary, detailed))
 
 
 def get_grounding_metadata(user_question: str) -> dict:
@@ -203,21 +666,13 @@ def get_grounding_metadata(user_question: str) -> dict:
     client = get_client()
     store = get_or_create_file_search_store()
     
-    upload_files_to_file_search_store()
+    # Smart check - only uploads if needed, skips if files already indexed
+    ensure_files_uploaded()
     
     response = client.models.generate_content(
         model="gemini-2.5-flash",
         contents=user_question,
-        config=types.GenerateContentConfig(
-            system_instruction=SYSTEM_PROMPT,
-            tools=[
-                types.Tool(
-                    file_search=types.FileSearch(
-                        file_search_store_names=[store.name]
-                    )
-                )
-            ]
-        )
+        config=_generation_config(store.name),
     )
     
     return {
@@ -231,7 +686,6 @@ def list_store_documents() -> list[dict]:
     client = get_client()
     
     try:
-        files = list(client.files.list())
         return [
             {
                 "name": f.name, 
@@ -240,7 +694,7 @@ def list_store_documents() -> list[dict]:
                 "size_bytes": getattr(f, 'size_bytes', None),
                 "create_time": str(getattr(f, 'create_time', 'Unknown')),
             } 
-            for f in files
+            for f in client.files.list()
         ]
     except Exception as e:
         return [{"error": str(e)}]
@@ -251,7 +705,14 @@ def get_store_info() -> dict:
     client = get_client()
     store = get_or_create_file_search_store()
     
-    files = list(client.files.list())
+    # Keep just what the summary needs from each page rather than the full SDK objects
+    files = [
+        {
+            "display_name": f.display_name,
+            "state": f.state.name if hasattr(f.state, 'name') else str(f.state),
+        }
+        for f in client.files.list()
+    ]
     local_files = get_knowledge_files()
     
     return {
@@ -260,13 +721,7 @@ def get_store_info() -> dict:
         "create_time": str(store.create_time),
         "indexed_files": len(files),
         "local_files": len(local_files),
-        "files": [
-            {
-                "display_name": f.display_name,
-                "state": f.state.name if hasattr(f.state, 'name') else str(f.state),
-            }
-            for f in files
-        ]
+        "files": files,
     }
 
 
@@ -275,13 +730,28 @@ def delete_file_search_store():
     global _file_search_store, _files_checked
     client = get_client()
     
-    # Delete all files
+    # Delete all files, several at a time; one failure doesn't stop the rest
     try:
-        for f in client.files.list():
-            client.files.delete(name=f.name)
-            print(f"Deleted file: {f.display_name}")
+        files = [(f.name, f.display_name) for f in client.files.list()]
     except Exception as e:
-        print(f"Error deleting files: {e}")
+        print(f"Error listing files: {e}")
+        files = []
+    
+    deleted = 0
+    with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as executor:
+        futures = {
+            executor.submit(client.files.delete, name=name): display_name
+            for name, display_name in files
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+                deleted += 1
+                print(f"Deleted file: {futures[future]}")
+            except Exception as e:
+                print(f"Error deleting file {futures[future]}: {e}")
+    if files:
+        print(f"Deleted {deleted} of {len(files)} files")
     
     # Delete store
     try:
@@ -291,6 +761,9 @@ def delete_file_search_store():
                 print(f"Deleted store: {store.name}")
         _file_search_store = None
         _files_checked = False
+        MANIFEST_PATH.unlink(missing_ok=True)
+        _invalidate_remote_names()
+        clear_answer_cache()
     except Exception as e:
         print(f"Error deleting store: {e}")
 
@@ -1,5 +1,8 @@
 """Ingest PDFs into a local Chroma vector store for retrieval."""
 
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List
 
@@ -13,20 +16,31 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 ROOT_DIR = Path(__file__).resolve().parent.parent
 ASSETS_DIR = ROOT_DIR / "assets" / "knowledge_base"
 CHROMA_DIR = ROOT_DIR / "chroma_db"
+EMBEDDING_BATCH_SIZE = 100  # Chunks per OpenAI embeddings request
+ADD_BATCH_SIZE = 256  # Chunks written to Chroma per add_documents call
+
+
+def _load_pdf(pdf_path: Path) -> List:
+    return PyPDFLoader(str(pdf_path)).load()
 
 
 def load_pdfs(pdf_dir: Path) -> List:
-    """Load all PDFs from the knowledge base directory."""
+    """Load all PDFs from the knowledge base directory.
+    
+    Parsing is CPU-bound, so PDFs are parsed in parallel worker processes.
+    """
     pdf_paths = sorted(pdf_dir.glob("*.pdf"))
     if not pdf_paths:
         raise FileNotFoundError(
             f"No PDF files found in {pdf_dir}. Add lab papers before running ingestion."
         )
-    documents = []
-    for pdf_path in pdf_paths:
-        loader = PyPDFLoader(str(pdf_path))
-        documents.extend(loader.load())
-    return documents
+    workers = min(os.cpu_count() or 1, len(pdf_paths))
+    if workers == 1:
+        return [doc for pdf_path in pdf_paths for doc in _load_pdf(pdf_path)]
+    
+    # map keeps the documents in file order, so the index comes out the same every run
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [doc for docs in executor.map(_load_pdf, pdf_paths) for doc in docs]
 
 
 def split_documents(documents: List, chunk_size: int = 1000, chunk_overlap: int = 100):
@@ -39,14 +53,51 @@ def split_documents(documents: List, chunk_size: int = 1000, chunk_overlap: int
     return splitter.split_documents(documents)
 
 
+def _chunk_id(chunk) -> str:
+    """Stable ID for a chunk, so re-running ingestion doesn't add duplicates.
+    
+    Uses the PDF's file name rather than its full path, so every checkout of
+    the repo produces the same IDs.
+    """
+    source = Path(str(chunk.metadata.get("source", ""))).name
+    page = str(chunk.metadata.get("page", ""))
+    key = "\0".join([source, page, chunk.page_content])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
 def build_vectorstore(chunks, persist_dir: Path = CHROMA_DIR):
-    """Create a Chroma vector store from chunks and persist it to disk."""
-    embeddings = OpenAIEmbeddings()
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
+    """Create a Chroma vector store from chunks and persist it to disk.
+    
+    Chunks are embedded and written in batches. Chunks already in the store
+    (e.g. from a run that was interrupted) are skipped. Entries that don't
+    match a current chunk are removed first, so the collection mirrors the
+    knowledge base. That covers chunks of edited or deleted PDFs, and stores
+    built before chunks had stable IDs (random UUIDs): those are rebuilt,
+    not duplicated, on their first run.
+    """
+    embeddings = OpenAIEmbeddings(chunk_size=EMBEDDING_BATCH_SIZE)
+    vectorstore = Chroma(
         persist_directory=str(persist_dir),
+        embedding_function=embeddings,
     )
+    
+    # Identical chunks (e.g. repeated boilerplate on a page) share an ID; keep one
+    unique = {_chunk_id(chunk): chunk for chunk in chunks}
+    ids = list(unique)
+    
+    stale_ids = [i for i in vectorstore.get(include=[])["ids"] if i not in unique]
+    if stale_ids:
+        print(f"Removing {len(stale_ids)} outdated entries from the vector store")
+        for start in range(0, len(stale_ids), ADD_BATCH_SIZE):
+            vectorstore.delete(ids=stale_ids[start:start + ADD_BATCH_SIZE])
+    
+    for start in range(0, len(ids), ADD_BATCH_SIZE):
+        batch_ids = ids[start:start + ADD_BATCH_SIZE]
+        existing = set(vectorstore.get(ids=batch_ids, include=[])["ids"])
+        new_ids = [chunk_id for chunk_id in batch_ids if chunk_id not in existing]
+        if new_ids:
+            vectorstore.add_documents([unique[chunk_id] for chunk_id in new_ids], ids=new_ids)
+            print(f"Embedded {start + len(batch_ids)}/{len(ids)} chunks")
     vectorstore.persist()
     return vectorstore
 
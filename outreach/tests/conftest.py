@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The apps import their helpers as `src.*` from the outreach directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("langchain_openai")
+pytest.importorskip("langchain_community")
+
+from streamlit.testing.v1 import AppTest
+
+from src import chat_history
+
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+
+@pytest.fixture(autouse=True)
+def sessions_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_history, "SESSIONS_DIR", tmp_path)
+    return tmp_path
+
+
+def _flush():
+    chat_history._writer.submit(lambda: None).result()
+
+
+def test_session_id_stays_out_of_the_url(sessions_dir):
+    at = AppTest.from_file(str(APP_PATH)).run()
+
+    assert "sid" not in at.query_params
+    _flush()
+    assert list(sessions_dir.iterdir()) == []
+
+
+def test_save_link_puts_session_in_url(sessions_dir):
+    at = AppTest.from_file(str(APP_PATH)).run()
+    at.sidebar.button[0].click().run()
+
+    session_id = at.session_state.session_id
+    assert session_id in at.query_params["sid"]
+    _flush()
+    assert (sessions_dir / f"{session_id}.json").exists()
@@ -0,0 +1,72 @@
+import os
+import time
+
+import pytest
+
+from src import chat_history
+
+
+@pytest.fixture(autouse=True)
+def sessions_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_history, "SESSIONS_DIR", tmp_path)
+    monkeypatch.setattr(chat_history, "_last_prune", None)
+    return tmp_path
+
+
+def _flush():
+    chat_history._writer.submit(lambda: None).result()
+
+
+def _age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_save_and_load_round_trip():
+    session_id = chat_history.new_session_id()
+    chat_history.save_session(session_id, {"messages": [{"role": "user", "content": "Hi"}]})
+    _flush()
+
+    assert chat_history.load_session(session_id) == {
+        "messages": [{"role": "user", "content": "Hi"}]
+    }
+
+
+def test_expired_session_does_not_load(sessions_dir):
+    session_id = chat_history.new_session_id()
+    chat_history.save_session(session_id, {"messages": []})
+    _flush()
+    _age(sessions_dir / f"{session_id}.json", chat_history.SESSION_TTL + 60)
+
+    assert chat_history.load_session(session_id) == {}
+
+
+def test_prune_sessions_removes_only_expired_files(sessions_dir):
+    fresh = sessions_dir / "0123456789abcdef.json"
+    stale = sessions_dir / "fedcba9876543210.json"
+    stale_tmp = sessions_dir / "fedcba9876543210.json.1234.tmp"
+    other = sessions_dir / "notes.txt"
+    for path in (fresh, stale, stale_tmp, other):
+        path.write_text("{}", encoding="utf-8")
+    for path in (stale, stale_tmp, other):
+        _age(path, chat_history.SESSION_TTL + 60)
+
+    assert chat_history.prune_sessions() == 2
+    assert sorted(p.name for p in sessions_dir.iterdir()) == [fresh.name, other.name]
+
+
+def test_first_save_sweeps_expired_sessions(sessions_dir):
+    stale = sessions_dir / "fedcba9876543210.json"
+    stale.write_text("{}", encoding="utf-8")
+    _age(stale, chat_history.SESSION_TTL + 60)
+
+    chat_history.save_session(chat_history.new_session_id(), {"messages": []})
+    _flush()
+
+    assert not stale.exists()
+
+
+def test_rejects_unsafe_session_ids():
+    assert not chat_history.is_valid_session_id("../../etc/passwd")
+    with pytest.raises(ValueError):
+        chat_history.load_session("../secrets")
@@ -0,0 +1,15 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from src.fileio import atomic_write_text
+
+
+def test_concurrent_writers_never_share_a_temp_file(tmp_path):
+    path = tmp_path / ".index_manifest.json"
+    payloads = [json.dumps({"writer": i, "pad": "x" * 10_000}) for i in range(16)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda text: atomic_write_text(path, text), payloads))
+
+    assert path.read_text(encoding="utf-8") in payloads
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
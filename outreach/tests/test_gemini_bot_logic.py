@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("google.genai")
+pytest.importorskip("dotenv")
+
+from src import gemini_bot_logic as logic
+
+
+def _texts(contents):
+    return [(content.role, content.parts[0].text) for content in contents]
+
+
+def test_build_contents_skips_empty_and_errored_replies():
+    history = [
+        {"role": "user", "content": "What is CODEX?"},
+        {"role": "assistant", "content": "A multiplexed imaging method."},
+        {"role": "user", "content": "Who founded the lab?"},
+        {"role": "assistant", "content": ""},
+        {"role": "user", "content": "What tissues do you study?"},
+        {"role": "assistant", "content": "Error generating response: 503 UNAVAILABLE"},
+        {"role": "user", "content": "Any open positions?"},
+        {"role": "assistant", "content": "Something went wrong: timed out"},
+        {"role": "user", "content": "How do I visit?"},
+        {"role": "assistant", "content": logic.NO_ANSWER_MESSAGE},
+    ]
+
+    contents = logic._build_contents("Tell me more.", history)
+
+    assert _texts(contents) == [
+        ("user", "What is CODEX?"),
+        ("model", "A multiplexed imaging method."),
+        ("user", "Tell me more."),
+    ]
+
+
+def test_build_contents_keeps_roles_alternating():
+    history = [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "   "},
+        {"role": "user", "content": "What is spatial omics?"},
+        {"role": "assistant", "content": "Measuring molecules where they sit in tissue."},
+    ]
+
+    roles = [content.role for content in logic._build_contents("Thanks!", history)]
+
+    assert roles == ["user", "model", "user"]
@@ -7,7 +7,7 @@ Usage:
     python manage_store.py                  # Show interactive menu
     python manage_store.py status           # Quick status check
     python manage_store.py list             # List all indexed files
-    python manage_store.py sync             # Sync new local files to store
+    python manage_store.py sync             # Sync new or changed local files to store
     python manage_store.py upload <file>    # Upload a specific file
     python manage_store.py delete <file>    # Delete a specific file
     python manage_store.py clear            # Delete all files and store
@@ -15,9 +15,13 @@ Usage:
     python manage_store.py chat             # Interactive chat mode
 """
 
+import hashlib
+import json
 import os
+import random
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
@@ -25,12 +29,26 @@ from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 
+ROOT_DIR = Path(__file__).resolve().parent
+APP_DIR = ROOT_DIR.parent  # outreach/, which holds the knowledge base and the chat app's state
+
+# Share the app's file helpers when run as a script from any directory
+sys.path.insert(0, str(APP_DIR))
+from src.fileio import atomic_write_text  # noqa: E402
+
 # Load environment
 load_dotenv()
-
-ROOT_DIR = Path(__file__).resolve().parent
-ASSETS_DIR = ROOT_DIR / "assets" / "knowledge_base"
+ASSETS_DIR = APP_DIR / "assets" / "knowledge_base"
 FILE_SEARCH_STORE_NAME = "hickey-lab-knowledge-base"
+# Shared with the chat app (src/gemini_bot_logic.py), so neither re-uploads what
+# the other just indexed: {file name: {sha256, mtime_ns, size}}
+INDEX_MANIFEST_PATH = APP_DIR / ".index_manifest.json"
+# The chat app caches the indexed file names here; drop it whenever we change the store
+APP_REMOTE_NAMES_CACHE = APP_DIR / ".remote_names.json"
+UPLOAD_CONCURRENCY = max(1, int(os.getenv("UPLOAD_CONCURRENCY", "6")))  # Parallel uploads in sync
+DELETE_CONCURRENCY = 10  # Parallel file deletes in clear
+CHAT_MAX_TURNS = 10  # Exchanges kept as context in chat mode
+STATUS_LIST_LIMIT = 50  # Names shown per section in status before "… N more"
 
 SYSTEM_PROMPT = """You are a warm, caring assistant for anyone curious about the Hickey Lab at Duke University.
 Explain spatial omics and our research in friendly, plain language while staying accurate.
@@ -44,27 +62,124 @@ When answering:
 """
 
 
+_client = None
+_store = None
+
+
 def get_client():
-    """Get Gemini client."""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("❌ GEMINI_API_KEY not found in .env file")
-        sys.exit(1)
-    return genai.Client(api_key=api_key)
+    """Get the Gemini client (one per run, so commands share its open connections)."""
+    global _client
+    if _client is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            print("❌ GEMINI_API_KEY not found in .env file")
+            sys.exit(1)
+        _client = genai.Client(api_key=api_key)
+    return _client
 
 
 def get_store(client):
-    """Get the File Search store."""
-    for store in client.file_search_stores.list():
-        if store.display_name == FILE_SEARCH_STORE_NAME:
-            return store
-    return None
+    """Get the File Search store (looked up once per run, then reused)."""
+    global _store
+    if _store is None:
+        for store in client.file_search_stores.list():
+            if store.display_name == FILE_SEARCH_STORE_NAME:
+                _store = store
+                break
+    return _store
 
 
 def get_local_files():
     """Get local knowledge base files."""
     supported = {".pdf", ".txt", ".md"}
-    return sorted([f for f in ASSETS_DIR.glob("*") if f.suffix in supported])
+    if not ASSETS_DIR.is_dir():
+        return []
+    with os.scandir(ASSETS_DIR) as entries:
+        files = [Path(e.path) for e in entries
+                 if e.is_file() and Path(e.name).suffix.lower() in supported]
+    return sorted(files, key=lambda p: p.name)
+
+
+def wait_for_operation(client, operation, base=0.5, cap=None):
+    """Poll an operation until done, backing off exponentially with full jitter.
+    
+    The wait is capped at POLL_CAP_SECONDS (default 8), read at call time
+    like the app's copy of this helper in src/gemini_bot_logic.py.
+    """
+    if cap is None:
+        cap = float(os.getenv("POLL_CAP_SECONDS", "8"))
+    attempt = 0
+    while not operation.done:
+        # Clamp the exponent: the cap is reached long before, and 2.0 ** 1024 overflows
+        time.sleep(random.uniform(0, min(cap, base * 2 ** min(attempt, 10))))
+        operation = client.operations.get(operation)
+        attempt += 1
+    return operation
+
+
+def upload_file(client, store, file_path):
+    """Upload one file to the store and wait until it's indexed."""
+    operation = client.file_search_stores.upload_to_file_search_store(
+        file=str(file_path),
+        file_search_store_name=store.name,
+        config={'display_name': file_path.name}
+    )
+    wait_for_operation(client, operation)
+
+
+def file_sha256(file_path):
+    """Hash a file's contents without loading it all into memory."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_entry(file_path, previous=None):
+    """Fingerprint a file, reusing the recorded hash when mtime and size still match."""
+    stat = file_path.stat()
+    if isinstance(previous, dict) and (previous.get("mtime_ns"), previous.get("size")) == (
+        stat.st_mtime_ns, stat.st_size
+    ):
+        return previous
+    return {"sha256": file_sha256(file_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def recorded_sha256(entry):
+    """Get the hash from a manifest entry (older manifests stored it directly)."""
+    return entry.get("sha256") if isinstance(entry, dict) else entry
+
+
+def load_manifest():
+    """Load the index manifest shared with the chat app."""
+    try:
+        return json.loads(INDEX_MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    """Write the index manifest atomically."""
+    atomic_write_text(INDEX_MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def update_manifest(name, entry):
+    """Record (or with entry=None, forget) one file in the index manifest."""
+    manifest = load_manifest()
+    if entry is None:
+        manifest.pop(name, None)
+    else:
+        manifest[name] = entry
+    try:
+        save_manifest(manifest)
+    except OSError as e:
+        print(f"⚠️  Could not write index manifest: {e}")
+
+
+def invalidate_app_cache():
+    """Make the chat app re-list indexed files on its next check."""
+    APP_REMOTE_NAMES_CACHE.unlink(missing_ok=True)
 
 
 def format_size(size_bytes):
@@ -78,6 +193,29 @@ def format_size(size_bytes):
     return f"{size_bytes:.1f} TB"
 
 
+def print_names(names, limit=STATUS_LIST_LIMIT):
+    """Print a sorted list of file names, truncated after limit entries."""
+    names = sorted(names)
+    for name in names[:limit]:
+        print(f"      - {name}")
+    if len(names) > limit:
+        print(f"      … {len(names) - limit} more")
+
+
+def build_config(store_name):
+    """Build the File Search generation config for questions against the store."""
+    return types.GenerateContentConfig(
+        system_instruction=SYSTEM_PROMPT,
+        tools=[
+            types.Tool(
+                file_search=types.FileSearch(
+                    file_search_store_names=[store_name]
+                )
+            )
+        ]
+    )
+
+
 def cmd_status():
     """Show quick status."""
     client = get_client()
@@ -95,30 +233,29 @@ def cmd_status():
     print(f"   ID: {store.name}")
     print(f"   Created: {store.create_time.strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Get files
-    remote_files = list(client.files.list())
-    local_files = get_local_files()
+    # Get files (only the names are needed, so don't keep the file objects)
+    remote_count = 0
+    remote_names = set()
+    for f in client.files.list():
+        remote_count += 1
+        remote_names.add(f.display_name)
+    local_names = {f.name for f in get_local_files()}
     
     print(f"\n📁 Files:")
-    print(f"   Indexed (remote): {len(remote_files)}")
-    print(f"   Local: {len(local_files)}")
+    print(f"   Indexed (remote): {remote_count}")
+    print(f"   Local: {len(local_names)}")
     
     # Check sync status
-    local_names = {f.name for f in local_files}
-    remote_names = {f.display_name for f in remote_files}
-    
     new_files = local_names - remote_names
     orphaned = remote_names - local_names
     
     if new_files:
         print(f"\n⚠️  {len(new_files)} local file(s) not indexed:")
-        for f in new_files:
-            print(f"      - {f}")
+        print_names(new_files)
     
     if orphaned:
         print(f"\n⚠️  {len(orphaned)} indexed file(s) not in local folder:")
-        for f in orphaned:
-            print(f"      - {f}")
+        print_names(orphaned)
     
     if not new_files and not orphaned:
         print("\n✅ Store is in sync with local files!")
@@ -134,13 +271,10 @@ def cmd_list():
     print("📄 INDEXED FILES")
     print("="*50 + "\n")
     
-    files = list(client.files.list())
-    
-    if not files:
-        print("No files indexed.")
-        return
-    
-    for i, f in enumerate(files, 1):
+    # Print each file as its page arrives instead of waiting for the whole listing
+    count = 0
+    for i, f in enumerate(client.files.list(), 1):
+        count = i
         state_icon = "✅" if "ACTIVE" in str(f.state) else "⏳"
         size = format_size(getattr(f, 'size_bytes', None))
         create_time = getattr(f, 'create_time', None)
@@ -150,10 +284,14 @@ def cmd_list():
         print(f"      ID: {f.name}")
         print(f"      Size: {size} | Created: {time_str}")
         print()
+    
+    if not count:
+        print("No files indexed.")
 
 
 def cmd_sync():
-    """Sync local files to the store (upload new ones only)."""
+    """Sync local files to the store (upload new and changed ones only)."""
+    global _store
     client = get_client()
     store = get_store(client)
     
@@ -164,7 +302,7 @@ def cmd_sync():
     # Create store if needed
     if not store:
         print(f"Creating store: {FILE_SEARCH_STORE_NAME}")
-        store = client.file_search_stores.create(
+        store = _store = client.file_search_stores.create(
             config={'display_name': FILE_SEARCH_STORE_NAME}
         )
         print(f"✅ Created: {store.name}\n")
@@ -172,34 +310,60 @@ def cmd_sync():
     local_files = get_local_files()
     remote_files = {f.display_name: f for f in client.files.list()}
     
-    uploaded = 0
-    skipped = 0
-    failed = 0
+    manifest = load_manifest()
+    entries = {}
     
+    to_upload = []
+    skipped = 0
     for file_path in local_files:
-        if file_path.name in remote_files:
+        previous = manifest.get(file_path.name)
+        entry = entries[file_path.name] = manifest_entry(file_path, previous)
+        remote = remote_files.get(file_path.name)
+        
+        # Files indexed before the manifest existed are assumed current
+        if remote and (previous is None or recorded_sha256(previous) == entry["sha256"]):
             print(f"⏭️  Skipping (exists): {file_path.name}")
+            manifest[file_path.name] = entry
             skipped += 1
             continue
         
-        print(f"📤 Uploading: {file_path.name}...", end=" ", flush=True)
-        try:
-            operation = client.file_search_stores.upload_to_file_search_store(
-                file=str(file_path),
-                file_search_store_name=store.name,
-                config={'display_name': file_path.name}
-            )
-            
-            while not operation.done:
-                time.sleep(2)
-                operation = client.operations.get(operation)
-            
-            print("✅")
-            uploaded += 1
-        except Exception as e:
-            print(f"❌ {e}")
-            failed += 1
+        # Edited since the last sync: drop the stale copy before re-uploading. The
+        # old entry stays until the new upload succeeds, so a failure is retried.
+        if remote:
+            print(f"🔁 Changed: {file_path.name}")
+            try:
+                client.files.delete(name=remote.name)
+            except Exception as e:
+                print(f"⚠️  Could not delete previous version: {e}")
+        to_upload.append(file_path)
+    
+    uploaded = 0
+    failed = 0
     
+    # Uploads are network-bound, so run several at once
+    with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as executor:
+        # Workers only upload; progress is printed here so lines never interleave
+        futures = {}
+        for file_path in to_upload:
+            print(f"📤 Uploading: {file_path.name}...")
+            futures[executor.submit(upload_file, client, store, file_path)] = file_path
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                future.result()
+                print(f"✅ Uploaded: {file_path.name}")
+                manifest[file_path.name] = entries[file_path.name]
+                uploaded += 1
+            except Exception as e:
+                print(f"❌ Failed: {file_path.name} - {e}")
+                failed += 1
+    
+    try:
+        save_manifest(manifest)
+    except OSError as e:
+        print(f"⚠️  Could not write index manifest: {e}")
+    if to_upload:
+        invalidate_app_cache()
     print(f"\n📊 Summary: {uploaded} uploaded, {skipped} skipped, {failed} failed")
 
 
@@ -230,16 +394,9 @@ def cmd_upload(filename):
     
     print(f"\n📤 Uploading: {file_path.name}...", end=" ", flush=True)
     try:
-        operation = client.file_search_stores.upload_to_file_search_store(
-            file=str(file_path),
-            file_search_store_name=store.name,
-            config={'display_name': file_path.name}
-        )
-        
-        while not operation.done:
-            time.sleep(2)
-            operation = client.operations.get(operation)
-        
+        upload_file(client, store, file_path)
+        update_manifest(file_path.name, manifest_entry(file_path))
+        invalidate_app_cache()
         print("✅ Done!")
     except Exception as e:
         print(f"❌ Failed: {e}")
@@ -268,13 +425,22 @@ def cmd_delete(filename):
     print(f"🗑️  Deleting: {target.display_name}...", end=" ", flush=True)
     try:
         client.files.delete(name=target.name)
+        update_manifest(target.display_name, None)
+        invalidate_app_cache()
         print("✅ Done!")
     except Exception as e:
         print(f"❌ Failed: {e}")
 
 
 def cmd_clear():
-    """Delete all files and the store."""
+    """Delete all files and the store.
+    
+    Deleting the store with force=True removes its documents in one call. The
+    Files API entries are deleted too, since sync and the chat app use that
+    listing to decide what is already indexed; leaving them would make the
+    next sync skip every file and leave the new store empty.
+    """
+    global _store
     client = get_client()
     store = get_store(client)
     
@@ -285,7 +451,7 @@ def cmd_clear():
     files = list(client.files.list())
     
     print(f"\n⚠️  This will delete:")
-    print(f"   - Store: {store.display_name}")
+    print(f"   - Store: {store.display_name} (and all its documents)")
     print(f"   - {len(files)} indexed file(s)")
     
     confirm = input("\nType 'DELETE' to confirm: ")
@@ -293,22 +459,32 @@ def cmd_clear():
         print("Cancelled.")
         return
     
-    print("\n🗑️  Deleting files...")
-    for f in files:
-        print(f"   - {f.display_name}...", end=" ", flush=True)
-        try:
-            client.files.delete(name=f.name)
-            print("✅")
-        except Exception as e:
-            print(f"❌ {e}")
+    if files:
+        print("\n🗑️  Deleting files...")
+        deleted = 0
+        with ThreadPoolExecutor(max_workers=DELETE_CONCURRENCY) as executor:
+            futures = {executor.submit(client.files.delete, name=f.name): f for f in files}
+            for future in as_completed(futures):
+                f = futures[future]
+                try:
+                    future.result()
+                    print(f"   - {f.display_name} ✅")
+                    deleted += 1
+                except Exception as e:
+                    print(f"   - {f.display_name} ❌ {e}")
+        print(f"   {deleted} of {len(files)} file(s) deleted")
     
     print(f"\n🗑️  Deleting store...", end=" ", flush=True)
     try:
         client.file_search_stores.delete(name=store.name, config={'force': True})
+        _store = None
         print("✅")
     except Exception as e:
         print(f"❌ {e}")
     
+    # Nothing is indexed any more, so the next sync must upload everything
+    INDEX_MANIFEST_PATH.unlink(missing_ok=True)
+    invalidate_app_cache()
     print("\n✅ Store cleared!")
 
 
@@ -327,40 +503,40 @@ def cmd_ask(question: str):
     print("-"*50 + "\n")
     
     try:
-        response = client.models.generate_content(
+        # Print the answer as it's generated; sources arrive with the later chunks
+        grounding = None
+        for chunk in client.models.generate_content_stream(
             model="gemini-2.5-flash",
             contents=question,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                tools=[
-                    types.Tool(
-                        file_search=types.FileSearch(
-                            file_search_store_names=[store.name]
-                        )
-                    )
-                ]
-            )
-        )
-        print(response.text)
+            config=build_config(store.name),
+        ):
+            if chunk.text:
+                print(chunk.text, end="", flush=True)
+            if chunk.candidates:
+                grounding = getattr(chunk.candidates[0], 'grounding_metadata', None) or grounding
+        print()
         
         # Show grounding info if available
-        if hasattr(response, 'candidates') and response.candidates:
-            grounding = getattr(response.candidates[0], 'grounding_metadata', None)
-            if grounding:
-                print("\n" + "-"*50)
-                print("📚 Sources used:")
-                print("-"*50)
-                # Try to extract source info
-                if hasattr(grounding, 'grounding_chunks'):
-                    for chunk in grounding.grounding_chunks[:3]:  # Show top 3
-                        if hasattr(chunk, 'retrieved_context'):
-                            print(f"  - {chunk.retrieved_context.title}")
+        if grounding:
+            print("\n" + "-"*50)
+            print("📚 Sources used:")
+            print("-"*50)
+            # Try to extract source info
+            if grounding.grounding_chunks:
+                for chunk in grounding.grounding_chunks[:3]:  # Show top 3
+                    if chunk.retrieved_context:
+                        print(f"  - {chunk.retrieved_context.title}")
     except Exception as e:
         print(f"❌ Error: {e}")
 
 
 def cmd_chat():
     """Interactive chat mode."""
+    try:
+        import readline  # noqa: F401 -- line editing and up-arrow history for input()
+    except ImportError:  # Not available on Windows
+        pass
+    
     client = get_client()
     store = get_store(client)
     
@@ -374,6 +550,11 @@ def cmd_chat():
     print("Ask questions about the Hickey Lab research.")
     print("Type 'quit' or 'exit' to leave.\n")
     
+    # The store doesn't change during a chat, so build the config once. The chat
+    # object keeps the conversation, so follow-up questions have context.
+    config = build_config(store.name)
+    chat = client.chats.create(model="gemini-2.5-flash", config=config)
+    
     while True:
         try:
             question = input("You: ").strip()
@@ -387,24 +568,23 @@ def cmd_chat():
             print("\n👋 Bye!")
             break
         
-        print("\n🤖 Assistant: ", end="", flush=True)
+        sys.stdout.write("\n🤖 Assistant: ")
+        sys.stdout.flush()
         
         try:
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=question,
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_PROMPT,
-                    tools=[
-                        types.Tool(
-                            file_search=types.FileSearch(
-                                file_search_store_names=[store.name]
-                            )
-                        )
-                    ]
+            for chunk in chat.send_message_stream(question):
+                if chunk.text:
+                    print(chunk.text, end="", flush=True)
+            print()
+            
+            # History is re-sent every turn, so keep only the recent exchanges
+            history = chat.get_history()
+            if len(history) > 2 * CHAT_MAX_TURNS:
+                chat = client.chats.create(
+                    model="gemini-2.5-flash",
+                    config=config,
+                    history=history[-2 * CHAT_MAX_TURNS:],
                 )
-            )
-            print(response.text)
         except Exception as e:
             print(f"Error: {e}")
         